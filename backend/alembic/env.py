@@ -5,7 +5,9 @@ import os
 from logging.config import fileConfig
 from sqlalchemy import create_engine
 from alembic import context
+from alembic.runtime.migration import MigrationContext
 from app.db import Base
+from app import migration_ops
 import app.models
 
 # Load and convert URL
@@ -19,6 +21,11 @@ config.set_main_option("sqlalchemy.url", SQLALCHEMY_URL)
 
 target_metadata = Base.metadata
 
+# `alembic -x dry_run=true upgrade head` prints the pending SQL with row
+# estimates and executes nothing
+x_args = context.get_x_argument(as_dictionary=True)
+DRY_RUN = x_args.get("dry_run", os.getenv("MIGRATION_DRY_RUN", "false")).lower() == "true"
+
 def run_migrations_offline():
     context.configure(
         url=SQLALCHEMY_URL,
@@ -27,16 +34,47 @@ def run_migrations_offline():
         dialect_opts={"paramstyle": "named"},
     )
     with context.begin_transaction():
+        context.execute(f"SET lock_timeout = '{migration_ops.LOCK_TIMEOUT}'")
+        context.execute(f"SET statement_timeout = '{migration_ops.STATEMENT_TIMEOUT}'")
+        context.run_migrations()
+
+def run_migrations_dry_run(connection):
+    """Render pending revisions as SQL from the database's current revision.
+
+    Nothing is executed: the connection is read-only and only used to read
+    alembic_version and for the helpers' planner estimates.
+    """
+    if connection.dialect.name == "postgresql":
+        connection.exec_driver_sql("SET SESSION CHARACTERISTICS AS TRANSACTION READ ONLY")
+        connection.commit()
+    heads = MigrationContext.configure(connection).get_current_heads()
+    connection.rollback()
+    migration_ops.configure(dry_run=True, estimate_bind=connection)
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        as_sql=True,
+        starting_rev=heads or None,
+        literal_binds=True,
+    )
+    with context.begin_transaction():
+        context.execute(f"SET lock_timeout = '{migration_ops.LOCK_TIMEOUT}'")
+        context.execute(f"SET statement_timeout = '{migration_ops.STATEMENT_TIMEOUT}'")
         context.run_migrations()
 
 def run_migrations_online():
     connectable = create_engine(SQLALCHEMY_URL, future=True)
 
     with connectable.connect() as connection:
+        migration_ops.apply_session_timeouts(connection)
+        if DRY_RUN:
+            run_migrations_dry_run(connection)
+            return
         context.configure(
             connection=connection,
             target_metadata=target_metadata,
             compare_type=True,
+            on_version_apply=migration_ops.revision_timer(),
         )
         with context.begin_transaction():
             context.run_migrations()
@@ -44,4 +82,4 @@ def run_migrations_online():
 if context.is_offline_mode():
     run_migrations_offline()
 else:
-    run_migrations_online()
\ No newline at end of file
+    run_migrations_online()
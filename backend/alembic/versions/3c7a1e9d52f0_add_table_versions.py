@@ -0,0 +1,38 @@
+"""add table versions
+
+Revision ID: 3c7a1e9d52f0
+Revises: 909dc16b4794
+Create Date: 2026-10-19 09:12:44.218301
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c7a1e9d52f0'
+down_revision: Union[str, None] = '909dc16b4794'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    table_versions = op.create_table('table_versions',
+    sa.Column('table_name', sa.String(length=64), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('table_name')
+    )
+    # Seed the tracked tables so version bumps are always plain updates
+    op.bulk_insert(table_versions, [
+        {'table_name': 'users', 'version': 1},
+        {'table_name': 'items', 'version': 1},
+    ])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('table_versions')
@@ -0,0 +1,62 @@
+"""add item owner
+
+Revision ID: a4d2f81b6c37
+Revises: 3c7a1e9d52f0
+Create Date: 2026-10-19 14:02:17.553190
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.migration_ops import (
+    create_foreign_key_not_valid,
+    create_index_concurrently,
+    drop_index_concurrently,
+    validate_constraint,
+)
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d2f81b6c37'
+down_revision: Union[str, None] = '3c7a1e9d52f0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # validate_constraint() commits everything up to it before alembic_version
+    # moves, so the steps before it must be safe to run again if the index
+    # build below fails.
+
+    # Nullable without a default: a catalog-only change, no table rewrite
+    op.add_column('items', sa.Column('owner_id', sa.Integer(), nullable=True), if_not_exists=True)
+    create_foreign_key_not_valid(
+        'items_owner_id_fkey', 'items', 'users', ['owner_id'], ['id'], ondelete='CASCADE'
+    )
+
+    op.create_table('owner_item_counts',
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('item_count', sa.BigInteger(), nullable=False),
+    sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('owner_id'),
+    if_not_exists=True
+    )
+    op.execute(
+        "INSERT INTO owner_item_counts (owner_id, item_count) "
+        "SELECT owner_id, count(*) FROM items WHERE owner_id IS NOT NULL GROUP BY owner_id "
+        "ON CONFLICT (owner_id) DO NOTHING"
+    )
+
+    validate_constraint('items_owner_id_fkey', 'items')
+    create_index_concurrently('ix_items_owner_id_id', 'items', ['owner_id', 'id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    drop_index_concurrently('ix_items_owner_id_id', 'items')
+    op.drop_table('owner_item_counts')
+    op.drop_constraint('items_owner_id_fkey', 'items', type_='foreignkey')
+    op.drop_column('items', 'owner_id')
@@ -2,6 +2,7 @@ import os
 from datetime import datetime, timedelta, timezone
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from opentelemetry import trace
 import uuid
 
 JWT_SECRET = os.getenv("JWT_SECRET", "changeme")
@@ -10,25 +11,31 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+tracer = trace.get_tracer(__name__)
 
+@tracer.start_as_current_span("auth.create_refresh_token")
 def create_refresh_token(data: dict, expires_delta: timedelta = timedelta(days=7)):
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + expires_delta
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, JWT_SECRET, algorithm=ALGORITHM)
 
+@tracer.start_as_current_span("auth.verify_password")
 def verify_password(plain, hashed):
     return pwd_context.verify(plain, hashed)
 
+@tracer.start_as_current_span("auth.hash_password")
 def hash_password(password: str):
     return pwd_context.hash(password)
 
+@tracer.start_as_current_span("auth.create_access_token")
 def create_access_token(data: dict, expires_delta: timedelta = timedelta(minutes=30)):
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + (expires_delta or timedelta(minutes=15))
     to_encode.update({"exp": expire, "jti": str(uuid.uuid4())})
     return jwt.encode(to_encode, JWT_SECRET, algorithm=ALGORITHM)
 
+@tracer.start_as_current_span("auth.decode_token")
 def decode_token(token: str):
     try:
         payload = jwt.decode(token, JWT_SECRET, algorithms=[ALGORITHM])
@@ -0,0 +1,113 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import NamedTuple, Optional
+
+from fastapi import Request, Response
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import dialect_insert
+from app.models import TableVersion
+
+class TableState(NamedTuple):
+    table_name: str
+    version: int
+    updated_at: Optional[datetime]
+
+    @property
+    def etag(self) -> str:
+        return f'W/"{self.table_name}-{self.version}"'
+
+    @property
+    def last_modified(self) -> Optional[str]:
+        if self.updated_at is None:
+            return None
+        return format_datetime(self.updated_at, usegmt=True)
+
+    def headers(self) -> dict:
+        # Vary on both the 200 and the 304 so caches key them the same way
+        headers = {"ETag": self.etag, "Cache-Control": "private, no-cache", "Vary": "Accept-Encoding"}
+        if self.last_modified:
+            headers["Last-Modified"] = self.last_modified
+        return headers
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # SQLite hands back naive datetimes even for timezone-aware columns
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+async def get_table_state(session: AsyncSession, table_name: str) -> TableState:
+    """Read the version counter for a table; a single primary-key lookup."""
+    result = await session.execute(
+        select(TableVersion.version, TableVersion.updated_at).where(
+            TableVersion.table_name == table_name
+        )
+    )
+    row = result.one_or_none()
+    if row is None:
+        return TableState(table_name, 0, None)
+    return TableState(table_name, row.version, _as_utc(row.updated_at))
+
+
+def _updated_at_exprs(dialect_name: str):
+    """SQL for a new row's ``updated_at`` and for the next one of an existing row.
+
+    Last-Modified only has whole-second precision, so two writes within one
+    second must still yield different values or If-Modified-Since would keep
+    answering 304. The database clock is used so replicas with skewed clocks
+    can't move the value backwards.
+    """
+    if dialect_name == "postgresql":
+        now = func.date_trunc("second", func.now())
+        return now, func.greatest(now, TableVersion.updated_at + text("interval '1 second'"))
+    now = func.strftime("%Y-%m-%d %H:%M:%S", "now")
+    return now, func.max(now, func.datetime(TableVersion.updated_at, "+1 second"))
+
+
+async def bump_table_version(session: AsyncSession, table_name: str) -> None:
+    """Increment a table's version inside the caller's transaction."""
+    now, next_updated_at = _updated_at_exprs(session.get_bind().dialect.name)
+    insert = dialect_insert(session)
+    stmt = insert(TableVersion).values(table_name=table_name, version=1, updated_at=now)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[TableVersion.table_name],
+        set_={"version": TableVersion.version + 1, "updated_at": next_updated_at},
+    )
+    await session.execute(stmt)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so W/ prefixes are ignored
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def is_not_modified(request: Request, state: TableState) -> bool:
+    """Evaluate If-None-Match / If-Modified-Since against the table state."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, state.etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and state.updated_at is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return state.updated_at.replace(microsecond=0) <= since
+    return False
+
+
+def not_modified_response(state: TableState, metrics=None) -> Response:
+    if metrics is not None:
+        metrics.not_modified.labels(state.table_name).inc()
+    return Response(status_code=304, headers=state.headers())
@@ -1,11 +1,84 @@
-from app.db import database
-from app.models import users
-from app.schemas import UserCreate
+from typing import Optional
 
-async def get_users():
-    query = users.select()
-    return await database.fetch_all(query)
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
-async def create_user(user: UserCreate):
-    query = users.insert().values(name=user.name, email=user.email)
-    return await database.execute(query)
\ No newline at end of file
+from app.db import dialect_insert
+from app.models import Item, OwnerItemCount, RoleEnum, User
+
+
+async def insert_user(session: AsyncSession, name: str, email: str, hashed_password: str, role: RoleEnum):
+    """Insert a user unless the email is taken; returns None on conflict.
+
+    A single INSERT ... ON CONFLICT (email) DO NOTHING RETURNING replaces
+    check-then-insert, which took two round trips and could still race.
+    """
+    insert = dialect_insert(session)
+    stmt = (
+        insert(User)
+        .values(name=name, email=email, hashed_password=hashed_password, role=role)
+        .on_conflict_do_nothing(index_elements=[User.email])
+        .returning(User.id, User.name, User.email)
+    )
+    result = await session.execute(stmt)
+    return result.one_or_none()
+
+
+async def delete_user_returning(session: AsyncSession, user_id: int):
+    result = await session.execute(
+        delete(User).where(User.id == user_id).returning(User.id, User.email)
+    )
+    return result.one_or_none()
+
+
+async def list_owner_items(session: AsyncSession, owner_id: int, after: Optional[int], limit: int):
+    """One keyset page of an owner's items, ordered by id.
+
+    Fetches one extra row to tell whether another page follows, so the
+    query never needs an OFFSET or a COUNT(*).
+    """
+    query = (
+        select(Item.id, Item.name, Item.description, Item.price)
+        .where(Item.owner_id == owner_id)
+        .order_by(Item.id)
+        .limit(limit + 1)
+    )
+    if after is not None:
+        query = query.where(Item.id > after)
+    rows = (await session.execute(query)).all()
+    next_cursor = rows[limit - 1].id if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+async def delete_item_returning(session: AsyncSession, item_id: int, owner_id: Optional[int]):
+    """Delete an item in one statement; ``owner_id=None`` skips the ownership check."""
+    stmt = delete(Item).where(Item.id == item_id)
+    if owner_id is not None:
+        stmt = stmt.where(Item.owner_id == owner_id)
+    result = await session.execute(stmt.returning(Item.id, Item.name, Item.owner_id))
+    return result.one_or_none()
+
+
+async def get_item_count(session: AsyncSession, owner_id: int) -> int:
+    result = await session.execute(
+        select(OwnerItemCount.item_count).where(OwnerItemCount.owner_id == owner_id)
+    )
+    return result.scalar_one_or_none() or 0
+
+
+async def adjust_item_count(session: AsyncSession, owner_id: int, delta: int) -> None:
+    """Keep the per-owner item count in step with inserts and deletes."""
+    if delta < 0:
+        await session.execute(
+            update(OwnerItemCount)
+            .where(OwnerItemCount.owner_id == owner_id)
+            .values(item_count=OwnerItemCount.item_count + delta)
+        )
+        return
+    insert = dialect_insert(session)
+    stmt = insert(OwnerItemCount).values(owner_id=owner_id, item_count=delta)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[OwnerItemCount.owner_id],
+        set_={"item_count": OwnerItemCount.item_count + delta},
+    )
+    await session.execute(stmt)
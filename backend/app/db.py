@@ -1,6 +1,7 @@
 import os
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.dialects import postgresql, sqlite
 from dotenv import load_dotenv
 from typing import AsyncGenerator
 
@@ -18,6 +19,12 @@ Base = declarative_base()
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     async with SessionLocal() as session:
         yield session
-        
+
+def dialect_insert(session: AsyncSession):
+    """Return the dialect's ``insert`` construct, which supports ON CONFLICT."""
+    if session.get_bind().dialect.name == "sqlite":
+        return sqlite.insert
+    return postgresql.insert
+
 from sqlalchemy.ext.asyncio import AsyncSession
 from contextlib import asynccontextmanager
\ No newline at end of file
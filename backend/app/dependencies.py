@@ -1,3 +1,5 @@
+from typing import NamedTuple
+
 from fastapi import Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
@@ -10,6 +12,14 @@ from app.auth import decode_token
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
 
 
+class CurrentUser(NamedTuple):
+    """Lightweight projection of the authenticated user (no ORM tracking)."""
+    id: int
+    name: str
+    email: str
+    role: RoleEnum
+
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme), 
     session: AsyncSession = Depends(get_db)
@@ -18,15 +28,17 @@ async def get_current_user(
     if user_id is None:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    result = await session.execute(select(User).where(User.id == int(user_id)))
-    user = result.scalar_one_or_none()
-    if not user:
+    result = await session.execute(
+        select(User.id, User.name, User.email, User.role).where(User.id == int(user_id))
+    )
+    row = result.one_or_none()
+    if row is None:
         raise HTTPException(status_code=403, detail="User not found")
-    return user
+    return CurrentUser(*row)
 
 
 def require_role(required_role: RoleEnum):
-    async def role_checker(user: User = Depends(get_current_user)):
+    async def role_checker(user: CurrentUser = Depends(get_current_user)):
         if user.role != required_role:
             raise HTTPException(status_code=403, detail="Not authorized")
         return user
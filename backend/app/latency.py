@@ -0,0 +1,224 @@
+"""Rolling-window latency quantiles and SLO burn rates per route template.
+
+Each route keeps a ring of DDSketches per window (1m, 5m, 1h). A DDSketch
+stores log-spaced bucket counts, so quantiles are within ``relative_accuracy``
+of the true value and memory depends on the latency *range*, not on traffic.
+Sketches from several workers can be merged exactly via ``to_dict`` /
+``from_dict`` / ``merge``.
+
+The SLO is "``objective`` of requests finish within ``threshold`` seconds
+without a 5xx". The burn rate is the observed bad ratio divided by the error
+budget ``1 - objective``; a service is degraded when both the short and long
+window burn faster than ``burn_threshold`` (14.4 spends 2% of a 30-day budget
+in one hour).
+"""
+import math
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+QUANTILES = {"p50": 0.5, "p90": 0.9, "p99": 0.99, "p999": 0.999}
+
+
+class DDSketch:
+    """Mergeable quantile sketch with relative-error guarantees.
+
+    At most ``max_buckets`` buckets are kept; past that the lowest buckets
+    are collapsed together, which only loses accuracy on the fastest
+    requests.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, max_buckets: int = 2048, min_value: float = 1e-6):
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.min_value = min_value
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float, count: int = 1) -> None:
+        if value <= self.min_value:
+            self.zero_count += count
+        else:
+            key = math.ceil(math.log(value) / self._log_gamma)
+            self.buckets[key] = self.buckets.get(key, 0) + count
+            if len(self.buckets) > self.max_buckets:
+                self._collapse()
+        self.count += count
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def _collapse(self) -> None:
+        keys = sorted(self.buckets)
+        excess = keys[:len(keys) - self.max_buckets]
+        self.buckets[keys[len(excess)]] += sum(self.buckets.pop(k) for k in excess)
+
+    def merge(self, other: "DDSketch") -> None:
+        if other.gamma != self.gamma:
+            raise ValueError("Cannot merge sketches with different accuracy")
+        for key, count in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        if len(self.buckets) > self.max_buckets:
+            self._collapse()
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return self.min
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen > rank:
+                value = 2 * self.gamma ** key / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "buckets": {str(k): v for k, v in self.buckets.items()},
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "DDSketch":
+        sketch = cls(relative_accuracy=data["relative_accuracy"])
+        sketch.buckets = {int(k): v for k, v in data["buckets"].items()}
+        sketch.zero_count = data["zero_count"]
+        sketch.count = data["count"]
+        if sketch.count:
+            sketch.min, sketch.max = data["min"], data["max"]
+        return sketch
+
+
+class _Slot:
+    __slots__ = ("epoch", "relative_accuracy", "sketch", "total", "bad")
+
+    def __init__(self, relative_accuracy: float):
+        self.relative_accuracy = relative_accuracy
+        self.reset(-1)
+
+    def reset(self, epoch: int) -> None:
+        self.epoch = epoch
+        self.sketch = DDSketch(self.relative_accuracy)
+        self.total = 0
+        self.bad = 0
+
+
+class RollingWindow:
+    """A ring of ``slots`` sketches covering the last ``seconds`` seconds.
+
+    Old slots are reused in place, so the ring never grows; a query merges
+    the slots still inside the window (granularity ``seconds / slots``).
+    """
+
+    def __init__(self, seconds: float, slots: int = 12, relative_accuracy: float = 0.01):
+        self.seconds = seconds
+        self.slot_width = seconds / slots
+        self.relative_accuracy = relative_accuracy
+        self._ring = [_Slot(relative_accuracy) for _ in range(slots)]
+
+    def _slot(self, now: float) -> _Slot:
+        epoch = int(now // self.slot_width)
+        slot = self._ring[epoch % len(self._ring)]
+        if slot.epoch != epoch:
+            slot.reset(epoch)
+        return slot
+
+    def record(self, duration: float, bad: bool, now: float) -> None:
+        slot = self._slot(now)
+        slot.sketch.add(duration)
+        slot.total += 1
+        slot.bad += bad
+
+    def _live(self, now: float) -> Iterable[_Slot]:
+        oldest = int(now // self.slot_width) - len(self._ring)
+        return (slot for slot in self._ring if slot.epoch > oldest)
+
+    def sketch(self, now: float) -> DDSketch:
+        merged = DDSketch(self.relative_accuracy)
+        for slot in self._live(now):
+            merged.merge(slot.sketch)
+        return merged
+
+    def counts(self, now: float):
+        total = bad = 0
+        for slot in self._live(now):
+            total += slot.total
+            bad += slot.bad
+        return total, bad
+
+
+WINDOWS = {"1m": 60, "5m": 300, "1h": 3600}
+
+
+class LatencyTracker:
+    def __init__(self, threshold: float = 0.3, objective: float = 0.99, burn_threshold: float = 14.4,
+                 min_requests: int = 20, clock: Callable[[], float] = time.time):
+        self.threshold = threshold
+        self.objective = objective
+        self.burn_threshold = burn_threshold
+        self.min_requests = min_requests
+        self.clock = clock
+        self.routes: Dict[str, Dict[str, RollingWindow]] = {}
+
+    def record(self, route: str, duration: float, status: int) -> None:
+        windows = self.routes.get(route)
+        if windows is None:
+            windows = self.routes[route] = {name: RollingWindow(seconds) for name, seconds in WINDOWS.items()}
+        bad = status >= 500 or duration > self.threshold
+        now = self.clock()
+        for window in windows.values():
+            window.record(duration, bad, now)
+
+    def quantiles(self, include_sketches: bool = False) -> dict:
+        now = self.clock()
+        report = {}
+        for route, windows in sorted(self.routes.items()):
+            report[route] = {}
+            for name, window in windows.items():
+                sketch = window.sketch(now)
+                entry = {"count": sketch.count}
+                entry.update({label: sketch.quantile(q) for label, q in QUANTILES.items()})
+                if include_sketches:
+                    entry["sketch"] = sketch.to_dict()
+                report[route][name] = entry
+        return report
+
+    def burn_rate(self, window: str) -> Optional[float]:
+        """Bad-request ratio over the error budget, across all routes."""
+        now = self.clock()
+        total = bad = 0
+        for windows in self.routes.values():
+            t, b = windows[window].counts(now)
+            total += t
+            bad += b
+        if total < self.min_requests:
+            return None
+        return (bad / total) / (1 - self.objective)
+
+    def status(self) -> dict:
+        short, long = self.burn_rate("5m"), self.burn_rate("1h")
+        degraded = (
+            short is not None and long is not None
+            and short > self.burn_threshold and long > self.burn_threshold
+        )
+        return {
+            "degraded": degraded,
+            "burn_rate": {"5m": short, "1h": long},
+            "burn_threshold": self.burn_threshold,
+            "objective": self.objective,
+            "threshold_seconds": self.threshold,
+        }
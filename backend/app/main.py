@@ -1,15 +1,16 @@
 import os
-from fastapi import FastAPI, Depends, HTTPException, Response, Cookie, Request
+from typing import Optional
+from fastapi import FastAPI, Depends, HTTPException, Response, Cookie, Request, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.middleware.httpsredirect import HTTPSRedirectMiddleware
-from app.db import get_db
+from app.db import get_db, engine
 from app.models import User, Item, RoleEnum
 from app.schemas import UserCreate, ItemCreate, UserLogin, TokenResponse
-from prometheus_client import Counter, generate_latest, CONTENT_TYPE_LATEST
 from starlette.responses import Response as StarletteResponse
 from starlette.middleware.base import BaseHTTPMiddleware
 from alembic.config import Config
@@ -22,26 +23,42 @@ from app.auth import (
     decode_token,
 )
 from fastapi.security import OAuth2PasswordBearer
-from app.dependencies import get_current_user, require_role
+from app.dependencies import CurrentUser, get_current_user, require_role
+from app.conditional import get_table_state, bump_table_version, is_not_modified, not_modified_response
+from app.compression import CompressionMiddleware
+from app.metrics import AppMetrics, MetricsExposition, UNMATCHED_ROUTE
+from app.latency import LatencyTracker, WINDOWS
+from app.tracing import tracing_enabled, configure_tracing, instrument_app, instrument_engine, add_trace_context
+from app.crud import (
+    insert_user,
+    delete_user_returning,
+    list_owner_items,
+    delete_item_returning,
+    get_item_count,
+    adjust_item_count,
+)
 from loguru import logger
 import time
 import json
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
-REQUEST_COUNT = Counter("http_requests_total", "Total HTTP Requests")
+
+# Probes and scrapes would swamp the latency SLO with trivial requests
+SLO_EXCLUDED_ROUTES = {"/healthz", "/readyz", "/metrics"}
 
 # Configure Loguru for structured logging
 logger.remove()
+logger.configure(patcher=add_trace_context)
 logger.add(
     "logs/app.log",
     rotation="10 MB",
     retention="7 days",
-    format="{time:YYYY-MM-DD HH:mm:ss} | {level} | {name}:{function}:{line} | {message}",
+    format="{time:YYYY-MM-DD HH:mm:ss} | {level} | trace_id={extra[trace_id]} | {name}:{function}:{line} | {message}",
     level="INFO"
 )
 logger.add(
     lambda msg: print(msg, end=""),
-    format="{time:YYYY-MM-DD HH:mm:ss} | {level} | {message}",
+    format="{time:YYYY-MM-DD HH:mm:ss} | {level} | trace_id={extra[trace_id]} | {message}",
     level="INFO"
 )
 
@@ -60,8 +77,20 @@ class SecurityHeadersMiddleware(BaseHTTPMiddleware):
         return response
 
 class LoggingMiddleware(BaseHTTPMiddleware):
+    def __init__(self, app, latency: Optional[LatencyTracker] = None):
+        super().__init__(app)
+        self.latency = latency
+
+    def record_latency(self, request: Request, status_code: int, process_time: float):
+        if self.latency is None:
+            return
+        route = request.scope.get("route")
+        path = getattr(route, "path", UNMATCHED_ROUTE)
+        if path not in SLO_EXCLUDED_ROUTES:
+            self.latency.record(path, process_time, status_code)
+
     async def dispatch(self, request: Request, call_next):
-        start_time = time.time()
+        start_time = time.perf_counter()
         
         # Log request
         logger.info(
@@ -78,7 +107,8 @@ class LoggingMiddleware(BaseHTTPMiddleware):
             response = await call_next(request)
             
             # Log response
-            process_time = time.time() - start_time
+            process_time = time.perf_counter() - start_time
+            self.record_latency(request, response.status_code, process_time)
             logger.info(
                 "Request completed",
                 extra={
@@ -93,7 +123,8 @@ class LoggingMiddleware(BaseHTTPMiddleware):
             
         except Exception as e:
             # Log error
-            process_time = time.time() - start_time
+            process_time = time.perf_counter() - start_time
+            self.record_latency(request, 500, process_time)
             logger.error(
                 "Request failed",
                 extra={
@@ -114,9 +145,22 @@ def create_app():
         redoc_url="/redoc" if os.getenv("ENVIRONMENT", "development") == "development" else None
     )
 
+    # Each app owns its registry, so create_app() can safely run more than once
+    app_metrics = AppMetrics(max_label_sets=int(os.getenv("METRICS_MAX_LABEL_SETS", "1000")))
+    exposition = MetricsExposition(app_metrics.registry, ttl=float(os.getenv("METRICS_CACHE_TTL", "1.0")))
+    app.state.metrics = app_metrics
+
+    latency = LatencyTracker(
+        threshold=float(os.getenv("SLO_LATENCY_THRESHOLD_MS", "300")) / 1000,
+        objective=float(os.getenv("SLO_OBJECTIVE", "0.99")),
+        burn_threshold=float(os.getenv("SLO_BURN_RATE_THRESHOLD", "14.4")),
+        min_requests=int(os.getenv("SLO_MIN_REQUESTS", "20")),
+    )
+    app.state.latency = latency
+
     # Add security middleware
     app.add_middleware(SecurityHeadersMiddleware)
-    app.add_middleware(LoggingMiddleware)
+    app.add_middleware(LoggingMiddleware, latency=latency)
     
     # Add trusted host middleware for production
     if os.getenv("ENVIRONMENT") == "production":
@@ -147,18 +191,38 @@ def create_app():
         allow_credentials=True,
         allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
         allow_headers=["*"],
-        expose_headers=["X-Total-Count"],
+        expose_headers=["X-Total-Count", "X-Next-Cursor", "ETag", "Last-Modified"],
+    )
+
+    app.add_middleware(
+        CompressionMiddleware,
+        metrics=app_metrics,
+        minimum_size=int(os.getenv("COMPRESSION_MINIMUM_SIZE", "500")),
     )
 
+    if tracing_enabled():
+        configure_tracing()
+        instrument_app(app)
+        instrument_engine(engine)
+
     @app.middleware("http")
     async def count_requests(request, call_next):
-        REQUEST_COUNT.inc()
-        return await call_next(request)
+        app_metrics.requests.inc()
+        start = time.perf_counter()
+        response = await call_next(request)
+        route = request.scope.get("route")
+        app_metrics.observe_request(
+            request.method,
+            getattr(route, "path", None),
+            response.status_code,
+            time.perf_counter() - start,
+        )
+        return response
 
     @app.get("/metrics")
-    def metrics():
-        data = generate_latest()
-        return StarletteResponse(content=data, media_type=CONTENT_TYPE_LATEST)
+    async def metrics(request: Request):
+        data, content_type = await exposition.render(request.headers.get("accept", ""))
+        return StarletteResponse(content=data, media_type=content_type)
 
     @app.post("/login", response_model=TokenResponse)
     async def login(
@@ -168,8 +232,10 @@ def create_app():
     ):
         logger.info(f"Login attempt for user: {user.email}")
         
-        result = await session.execute(select(User).where(User.email == user.email))
-        db_user = result.scalar_one_or_none()
+        result = await session.execute(
+            select(User.id, User.hashed_password).where(User.email == user.email)
+        )
+        db_user = result.one_or_none()
         if not db_user or not verify_password(user.password, db_user.hashed_password):
             logger.warning(f"Failed login attempt for user: {user.email}")
             raise HTTPException(status_code=401, detail="Invalid credentials")
@@ -205,68 +271,103 @@ def create_app():
         return {"access_token": new_access_token}
 
     @app.post("/logout")
-    async def logout(response: Response, current_user: User = Depends(get_current_user)):
+    async def logout(response: Response, current_user: CurrentUser = Depends(get_current_user)):
         response.delete_cookie("refresh_token", path="/refresh")
         logger.info(f"User logged out: {current_user.email}")
         return {"ok": True}
 
     @app.get("/users", dependencies=[Depends(require_role(RoleEnum.ADMIN))])
-    async def read_users(session: AsyncSession = Depends(get_db)):
+    async def read_users(request: Request, response: Response, session: AsyncSession = Depends(get_db)):
         logger.info("Admin user list requested")
-        result = await session.execute(select(User))
-        users = result.scalars().all()
-        return [{"id": u.id, "name": u.name, "email": u.email} for u in users]
+        state = await get_table_state(session, "users")
+        if is_not_modified(request, state):
+            return not_modified_response(state, app_metrics)
+        response.headers.update(state.headers())
+
+        result = await session.execute(select(User.id, User.name, User.email))
+        return [{"id": u.id, "name": u.name, "email": u.email} for u in result]
 
     @app.post("/register")
     async def create_user(user: UserCreate, session: AsyncSession = Depends(get_db)):
         logger.info(f"Registration attempt for user: {user.email}")
         
-        result = await session.execute(select(User).where(User.email == user.email))
-        if result.scalar_one_or_none():
+        try:
+            new_user = await insert_user(
+                session,
+                name=user.name,
+                email=user.email,
+                hashed_password=hash_password(user.password),
+                role=user.role,
+            )
+        except IntegrityError:
+            # A unique violation that ON CONFLICT did not absorb is still a duplicate user
+            await session.rollback()
+            new_user = None
+        if new_user is None:
             logger.warning(f"Registration failed - email already exists: {user.email}")
             raise HTTPException(400, detail="Email already registered")
         
-        new_user = User(
-            name=user.name,
-            email=user.email,
-            hashed_password=hash_password(user.password),
-            role=user.role,
-        )
-        session.add(new_user)
+        await bump_table_version(session, "users")
         await session.commit()
-        await session.refresh(new_user)
         
         logger.info(f"User registered successfully: {user.email}")
         return {"id": new_user.id, "name": new_user.name, "email": new_user.email}
 
     @app.get("/me")
-    async def get_me(current_user: User = Depends(get_current_user)):
+    async def get_me(current_user: CurrentUser = Depends(get_current_user)):
         return {"id": current_user.id, "name": current_user.name, "email": current_user.email, "role": current_user.role.value}
 
     @app.delete("/users/{user_id}")
     async def delete_user(
         user_id: int, 
         session: AsyncSession = Depends(get_db),
-        current_user: User = Depends(require_role(RoleEnum.ADMIN))
+        current_user: CurrentUser = Depends(require_role(RoleEnum.ADMIN))
     ):
         logger.info(f"User deletion requested by admin {current_user.email} for user ID: {user_id}")
         
-        result = await session.execute(select(User).where(User.id == user_id))
-        user = result.scalar_one_or_none()
+        user = await delete_user_returning(session, user_id)
         if user is None:
             logger.warning(f"User deletion failed - user not found: {user_id}")
             raise HTTPException(status_code=404, detail="User not found")
         
-        await session.delete(user)
+        await bump_table_version(session, "users")
+        # The user's items go with them (ON DELETE CASCADE)
+        await bump_table_version(session, "items")
         await session.commit()
         
         logger.info(f"User deleted successfully: {user.email}")
         return {"ok": True}
 
     @app.get("/items")
-    async def get_items(session: AsyncSession = Depends(get_db)):
-        result = await session.execute(select(Item))
-        items = result.scalars().all()
+    async def get_items(request: Request, response: Response, session: AsyncSession = Depends(get_db)):
+        state = await get_table_state(session, "items")
+        if is_not_modified(request, state):
+            return not_modified_response(state, app_metrics)
+        response.headers.update(state.headers())
+
+        result = await session.execute(select(Item.id, Item.name, Item.description, Item.price))
+        return [
+            {
+                "id": item.id,
+                "name": item.name,
+                "description": item.description,
+                "price": item.price,
+            }
+            for item in result
+        ]
+
+    @app.get("/me/items")
+    async def get_my_items(
+        response: Response,
+        after: Optional[int] = Query(None, description="Return items with an id greater than this cursor"),
+        limit: int = Query(50, ge=1, le=200),
+        session: AsyncSession = Depends(get_db),
+        current_user: CurrentUser = Depends(get_current_user)
+    ):
+        items, next_cursor = await list_owner_items(session, current_user.id, after, limit)
+        response.headers["X-Total-Count"] = str(await get_item_count(session, current_user.id))
+        if next_cursor is not None:
+            response.headers["X-Next-Cursor"] = str(next_cursor)
         return [
             {
                 "id": item.id,
@@ -281,12 +382,19 @@ def create_app():
     async def create_item(
         item: ItemCreate, 
         session: AsyncSession = Depends(get_db),
-        current_user: User = Depends(get_current_user)
+        current_user: CurrentUser = Depends(get_current_user)
     ):
         logger.info(f"Item creation requested by user: {current_user.email}")
         
-        new_item = Item(name=item.name, description=item.description, price=item.price)
+        new_item = Item(
+            name=item.name,
+            description=item.description,
+            price=item.price,
+            owner_id=current_user.id,
+        )
         session.add(new_item)
+        await adjust_item_count(session, current_user.id, 1)
+        await bump_table_version(session, "items")
         await session.commit()
         await session.refresh(new_item)
         
@@ -302,17 +410,21 @@ def create_app():
     async def delete_item(
         item_id: int, 
         session: AsyncSession = Depends(get_db),
-        current_user: User = Depends(get_current_user)
+        current_user: CurrentUser = Depends(get_current_user)
     ):
         logger.info(f"Item deletion requested by user {current_user.email} for item ID: {item_id}")
         
-        result = await session.execute(select(Item).where(Item.id == item_id))
-        item = result.scalar_one_or_none()
+        # Admins may delete any item; everyone else only their own. Items owned
+        # by someone else look exactly like missing ones.
+        owner_id = None if current_user.role == RoleEnum.ADMIN else current_user.id
+        item = await delete_item_returning(session, item_id, owner_id)
         if item is None:
             logger.warning(f"Item deletion failed - item not found: {item_id}")
             raise HTTPException(status_code=404, detail="Item not found")
         
-        await session.delete(item)
+        if item.owner_id is not None:
+            await adjust_item_count(session, item.owner_id, -1)
+        await bump_table_version(session, "items")
         await session.commit()
         
         logger.info(f"Item deleted successfully: {item.name}")
@@ -322,6 +434,29 @@ def create_app():
     def health_check():
         return {"ok": True, "timestamp": time.time()}
 
+    @app.get("/readyz")
+    async def readiness_check(response: Response):
+        status = latency.status()
+        # Reporting only by default: pulling every replica out of rotation
+        # because they all share a slow dependency makes things worse.
+        fail_when_degraded = os.getenv("SLO_DEGRADED_FAILS_READINESS", "false").lower() == "true"
+        ready = not (status["degraded"] and fail_when_degraded)
+        if not ready:
+            response.status_code = 503
+        return {"ok": ready, **status}
+
+    # async so the report is read on the event loop that records into the tracker
+    @app.get("/admin/latency")
+    async def get_latency(
+        include_sketches: bool = Query(False, description="Include serialized sketches for merging across workers"),
+        current_user: CurrentUser = Depends(require_role(RoleEnum.ADMIN))
+    ):
+        return {
+            "windows": list(WINDOWS),
+            "routes": latency.quantiles(include_sketches),
+            "slo": latency.status(),
+        }
+
     return app
 
 
@@ -0,0 +1,156 @@
+"""Per-app Prometheus metrics and a cached, off-loop exposition.
+
+Each app built by ``create_app`` owns its own ``CollectorRegistry``, so the
+factory can be called more than once in a process (tests, workers) without
+"Duplicated timeseries" errors from the global default registry.
+"""
+import threading
+import time
+from typing import Optional
+
+from opentelemetry import trace
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    GCCollector,
+    Histogram,
+    PlatformCollector,
+    ProcessCollector,
+    generate_latest,
+)
+from prometheus_client.openmetrics.exposition import (
+    CONTENT_TYPE_LATEST as OPENMETRICS_CONTENT_TYPE,
+    generate_latest as generate_openmetrics,
+)
+from starlette.concurrency import run_in_threadpool
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class _DroppedChild:
+    """Stands in for a label child that the cardinality guard refused."""
+
+    def inc(self, amount: float = 1) -> None:
+        pass
+
+    def observe(self, amount: float, exemplar: Optional[dict] = None) -> None:
+        pass
+
+
+_DROPPED = _DroppedChild()
+
+
+class GuardedMetric:
+    """Wraps a labelled metric and caps how many label sets it may create.
+
+    Label sets beyond ``limit`` are dropped and counted in
+    ``metrics_dropped_label_sets_total{metric=...}``.
+    """
+
+    def __init__(self, metric, name: str, limit: int, dropped: Counter):
+        self.metric = metric
+        self.name = name
+        self.limit = limit
+        self.dropped = dropped
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        key = tuple(str(v) for v in values)
+        if key not in self._seen:
+            with self._lock:
+                if key not in self._seen:
+                    if len(self._seen) >= self.limit:
+                        self.dropped.labels(metric=self.name).inc()
+                        return _DROPPED
+                    self._seen.add(key)
+        return self.metric.labels(*key)
+
+
+class AppMetrics:
+    def __init__(self, registry: Optional[CollectorRegistry] = None, max_label_sets: int = 1000):
+        self.registry = registry or CollectorRegistry()
+        ProcessCollector(registry=self.registry)
+        PlatformCollector(registry=self.registry)
+        GCCollector(registry=self.registry)
+
+        self.dropped_label_sets = Counter(
+            "metrics_dropped_label_sets_total",
+            "Label sets dropped by the cardinality guard",
+            ["metric"],
+            registry=self.registry,
+        )
+
+        def guarded(metric, name):
+            return GuardedMetric(metric, name, max_label_sets, self.dropped_label_sets)
+
+        self.requests = Counter("http_requests_total", "Total HTTP Requests", registry=self.registry)
+        self.request_duration = guarded(Histogram(
+            "http_request_duration_seconds",
+            "HTTP request duration in seconds",
+            ["method", "route", "status"],
+            registry=self.registry,
+        ), "http_request_duration_seconds")
+        self.not_modified = guarded(Counter(
+            "http_not_modified_total",
+            "Conditional GET requests answered with 304 Not Modified",
+            ["table"],
+            registry=self.registry,
+        ), "http_not_modified_total")
+        self.compressed_responses = guarded(Counter(
+            "http_compressed_responses_total",
+            "Responses compressed by the compression middleware",
+            ["encoding"],
+            registry=self.registry,
+        ), "http_compressed_responses_total")
+        self.compression_input_bytes = guarded(Counter(
+            "http_compression_input_bytes_total",
+            "Response bytes before compression",
+            ["encoding"],
+            registry=self.registry,
+        ), "http_compression_input_bytes_total")
+        self.compression_bytes_saved = guarded(Counter(
+            "http_compression_bytes_saved_total",
+            "Response bytes saved by compression",
+            ["encoding"],
+            registry=self.registry,
+        ), "http_compression_bytes_saved_total")
+
+    def observe_request(self, method: str, route: Optional[str], status: int, duration: float) -> None:
+        """Record a request; sampled traces are linked to the bucket as an exemplar."""
+        exemplar = None
+        span_context = trace.get_current_span().get_span_context()
+        if span_context.is_valid and span_context.trace_flags.sampled:
+            exemplar = {"trace_id": format(span_context.trace_id, "032x")}
+        self.request_duration.labels(method, route or UNMATCHED_ROUTE, status).observe(duration, exemplar=exemplar)
+
+
+class MetricsExposition:
+    """Renders the registry in a worker thread and reuses it for ``ttl`` seconds.
+
+    Serialising many series is CPU-bound and would otherwise block the event
+    loop on every scrape. Two scrapes racing on an expired cache may both
+    render; that only costs a little extra work.
+    """
+
+    def __init__(self, registry: CollectorRegistry, ttl: float = 1.0):
+        self.registry = registry
+        self.ttl = ttl
+        self._cache = {}
+
+    async def render(self, accept: str = ""):
+        openmetrics = "application/openmetrics-text" in accept
+        cached = self._cache.get(openmetrics)
+        now = time.monotonic()
+        if cached is not None and cached[0] > now:
+            return cached[1], cached[2]
+
+        if openmetrics:
+            data = await run_in_threadpool(generate_openmetrics, self.registry)
+            content_type = OPENMETRICS_CONTENT_TYPE
+        else:
+            data = await run_in_threadpool(generate_latest, self.registry)
+            content_type = CONTENT_TYPE_LATEST
+        self._cache[openmetrics] = (now + self.ttl, data, content_type)
+        return data, content_type
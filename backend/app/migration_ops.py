@@ -0,0 +1,299 @@
+"""Lock-safe building blocks for Alembic migrations on large tables.
+
+Use these from migration scripts instead of the plain ``op`` calls when a
+table is big enough for an ACCESS EXCLUSIVE lock or a full rewrite to stall
+the API. Every helper logs its duration.
+
+``alembic -x dry_run=true upgrade head`` executes nothing: ``env.py`` renders
+the pending revisions as SQL (like ``--sql``) and the helpers log planner row
+estimates read over a separate, read-only connection. Plain ``op.*`` calls
+are only rendered too, so a dry run takes no locks beyond those of the
+estimate queries.
+"""
+import logging
+import os
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Optional, Sequence
+
+from alembic import op
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+logger = logging.getLogger("alembic.migration_ops")
+
+LOCK_TIMEOUT = os.getenv("MIGRATION_LOCK_TIMEOUT", "5s")
+STATEMENT_TIMEOUT = os.getenv("MIGRATION_STATEMENT_TIMEOUT", "15min")
+
+_dry_run = False
+_estimate_bind = None
+
+
+def configure(dry_run: bool = False, estimate_bind=None) -> None:
+    """Switch dry-run mode; ``estimate_bind`` is the connection used for estimates."""
+    global _dry_run, _estimate_bind
+    _dry_run = dry_run
+    _estimate_bind = estimate_bind
+
+
+def is_dry_run() -> bool:
+    return _dry_run
+
+
+@contextmanager
+def timed_step(name: str):
+    logger.info("%s%s ...", "[dry-run] " if _dry_run else "", name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        logger.info("%s done in %.3fs", name, time.perf_counter() - start)
+
+
+def _is_postgres() -> bool:
+    return op.get_context().dialect.name == "postgresql"
+
+
+def _is_offline() -> bool:
+    return op.get_context().as_sql
+
+
+def _quote(name: str) -> str:
+    return op.get_context().dialect.identifier_preparer.quote(name)
+
+
+def apply_session_timeouts(connection) -> None:
+    """Set lock/statement timeouts for the whole migration connection.
+
+    A DDL statement queued behind a long transaction blocks every query
+    queued behind *it*; ``lock_timeout`` makes it fail fast instead.
+    """
+    if connection.dialect.name != "postgresql":
+        return
+    connection.exec_driver_sql(f"SET lock_timeout = '{LOCK_TIMEOUT}'")
+    connection.exec_driver_sql(f"SET statement_timeout = '{STATEMENT_TIMEOUT}'")
+    # Commit so Alembic does not mistake the SETs for an external transaction
+    connection.commit()
+
+
+@contextmanager
+def timeouts(lock_timeout: Optional[str] = None, statement_timeout: Optional[str] = None):
+    """Temporarily override the session timeouts ("0" disables a timeout)."""
+    if not _is_postgres():
+        yield
+        return
+    if lock_timeout is not None:
+        op.execute(f"SET lock_timeout = '{lock_timeout}'")
+    if statement_timeout is not None:
+        op.execute(f"SET statement_timeout = '{statement_timeout}'")
+    try:
+        yield
+    finally:
+        if lock_timeout is not None:
+            op.execute(f"SET lock_timeout = '{LOCK_TIMEOUT}'")
+        if statement_timeout is not None:
+            op.execute(f"SET statement_timeout = '{STATEMENT_TIMEOUT}'")
+
+
+def estimate_rows(table_name: str, where: Optional[str] = None) -> Optional[int]:
+    """Estimate rows in a table, or rows matching ``where``.
+
+    On Postgres this asks the planner (EXPLAIN), so the table is never
+    scanned; elsewhere it counts. Returns None when there is no connection
+    to ask, or in a dry run when the table or column is only created by an
+    earlier step of the same run.
+    """
+    if _dry_run:
+        bind = _estimate_bind
+    else:
+        bind = None if _is_offline() else op.get_bind()
+    if bind is None:
+        return None
+
+    sql = f"FROM {_quote(table_name)}"
+    if where:
+        sql += f" WHERE {where}"
+    try:
+        if bind.dialect.name == "postgresql":
+            plan = bind.execute(text(f"EXPLAIN (FORMAT JSON) SELECT 1 {sql}")).scalar()
+            return int(plan[0]["Plan"]["Plan Rows"])
+        return bind.execute(text(f"SELECT count(*) {sql}")).scalar()
+    except DBAPIError:
+        if not _dry_run:
+            raise
+        return None
+    finally:
+        # Don't leave the estimate connection idle in a transaction that
+        # holds ACCESS SHARE locks
+        if _dry_run:
+            bind.rollback()
+
+
+def _log_estimate(action: str, table_name: str, where: Optional[str] = None) -> None:
+    rows = estimate_rows(table_name, where)
+    logger.info("%s would touch ~%s rows of %s", action, "?" if rows is None else rows, table_name)
+
+
+def _estimate_only(action: str, table_name: str, where: Optional[str] = None) -> bool:
+    """Log a dry-run estimate; True if the step must not run at all.
+
+    Dry runs normally render SQL, so a step still emits its statements. On a
+    live migration connection it is skipped instead.
+    """
+    if not _dry_run:
+        return False
+    _log_estimate(action, table_name, where)
+    return not _is_offline()
+
+
+def _drop_invalid_index(index_name: str) -> None:
+    # A failed CONCURRENTLY build leaves an INVALID index behind that
+    # IF NOT EXISTS would silently keep
+    invalid = op.get_bind().execute(
+        text(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name AND NOT i.indisvalid"
+        ),
+        {"name": index_name},
+    ).scalar()
+    if invalid:
+        logger.warning("Dropping invalid index %s left by an earlier failed build", index_name)
+        op.drop_index(index_name, postgresql_concurrently=True, if_exists=True)
+
+
+def create_index_concurrently(index_name: str, table_name: str, columns: Sequence[str], unique: bool = False, **kw) -> None:
+    """CREATE INDEX CONCURRENTLY outside the migration transaction."""
+    with timed_step(f"create index {index_name} on {table_name}"):
+        if _estimate_only(f"create index {index_name}", table_name):
+            return
+        if not _is_postgres():
+            op.create_index(index_name, table_name, columns, unique=unique, **kw)
+            return
+        with op.get_context().autocommit_block():
+            if not _is_offline():
+                _drop_invalid_index(index_name)
+            # The build waits for every transaction older than itself, and
+            # those waits count against lock_timeout: a 5s limit would abort
+            # it halfway and leave an INVALID index. Its SHARE UPDATE
+            # EXCLUSIVE lock doesn't block reads or writes, so waiting is safe.
+            with timeouts(lock_timeout="0", statement_timeout="0"):
+                op.create_index(
+                    index_name, table_name, columns, unique=unique,
+                    postgresql_concurrently=True, if_not_exists=True, **kw
+                )
+
+
+def drop_index_concurrently(index_name: str, table_name: str) -> None:
+    with timed_step(f"drop index {index_name}"):
+        if _estimate_only(f"drop index {index_name}", table_name):
+            return
+        if not _is_postgres():
+            op.drop_index(index_name, table_name=table_name)
+            return
+        with op.get_context().autocommit_block():
+            op.drop_index(index_name, table_name=table_name, postgresql_concurrently=True, if_exists=True)
+
+
+def _constraint_exists(name: str, table_name: str) -> bool:
+    if _is_offline() or not _is_postgres():
+        return False
+    return op.get_bind().execute(
+        text("SELECT 1 FROM pg_constraint WHERE conname = :name AND conrelid = to_regclass(:table)"),
+        {"name": name, "table": table_name},
+    ).scalar() is not None
+
+
+def create_foreign_key_not_valid(name: str, source_table: str, referent_table: str,
+                                 local_cols: Sequence[str], remote_cols: Sequence[str], **kw) -> None:
+    """Add a foreign key without scanning existing rows; see validate_constraint().
+
+    Skipped if the constraint already exists, so a revision that committed
+    part-way (e.g. before a concurrent index build) can be re-run.
+    """
+    with timed_step(f"add foreign key {name} NOT VALID"):
+        if _estimate_only(f"add foreign key {name}", source_table):
+            return
+        if _constraint_exists(name, source_table):
+            logger.info("foreign key %s already exists", name)
+            return
+        op.create_foreign_key(name, source_table, referent_table, local_cols, remote_cols,
+                              postgresql_not_valid=True, **kw)
+
+
+def create_check_constraint_not_valid(name: str, table_name: str, condition: str) -> None:
+    """Add a CHECK constraint without scanning existing rows; see validate_constraint()."""
+    with timed_step(f"add check constraint {name} NOT VALID"):
+        if _estimate_only(f"add check constraint {name}", table_name):
+            return
+        op.create_check_constraint(name, table_name, condition, postgresql_not_valid=True)
+
+
+def validate_constraint(name: str, table_name: str) -> None:
+    """VALIDATE a NOT VALID constraint in its own transaction.
+
+    Validation only takes a SHARE UPDATE EXCLUSIVE lock, but only if the
+    ACCESS EXCLUSIVE lock from adding the constraint has been released, so
+    the pending transaction is committed first. That lock doesn't block
+    reads or writes, so ``lock_timeout`` is lifted as well.
+    """
+    with timed_step(f"validate constraint {name}"):
+        if _estimate_only(f"validate {name}", table_name):
+            return
+        if not _is_postgres():
+            return
+        with op.get_context().autocommit_block():
+            with timeouts(lock_timeout="0", statement_timeout="0"):
+                op.execute(f"ALTER TABLE {_quote(table_name)} VALIDATE CONSTRAINT {_quote(name)}")
+
+
+def batched_backfill(table_name: str, set_clause: str, where: Optional[str] = None,
+                     batch_size: int = 1000, pause: float = 0.05, key: str = "id") -> int:
+    """UPDATE a table in primary-key ranges, committing after each batch.
+
+    Each batch holds row locks only briefly and ``pause`` seconds between
+    batches gives replication and autovacuum room to keep up. Returns the
+    number of rows updated.
+    """
+    with timed_step(f"backfill {table_name} SET {set_clause}"):
+        if _estimate_only("backfill", table_name, where):
+            return 0
+
+        table, column = _quote(table_name), _quote(key)
+        condition = f" AND ({where})" if where else ""
+        if _is_offline():
+            op.execute(f"UPDATE {table} SET {set_clause}{' WHERE ' + where if where else ''}")
+            return 0
+
+        bind = op.get_bind()
+        low, high = bind.execute(text(f"SELECT min({column}), max({column}) FROM {table}")).one()
+        if low is None:
+            return 0
+
+        update = text(f"UPDATE {table} SET {set_clause} WHERE {column} > :start AND {column} <= :end{condition}")
+        total, start, batches = 0, low - 1, 0
+        # Commit per batch on Postgres; elsewhere stay in the migration transaction
+        block = op.get_context().autocommit_block() if _is_postgres() else nullcontext()
+        with block:
+            while start < high:
+                end = start + batch_size
+                total += bind.execute(update, {"start": start, "end": end}).rowcount
+                batches += 1
+                start = end
+                if pause and start < high:
+                    time.sleep(pause)
+        logger.info("backfill updated %d rows of %s in %d batches", total, table_name, batches)
+        return total
+
+
+def revision_timer():
+    """Build an ``on_version_apply`` hook that logs each revision's duration."""
+    last = time.perf_counter()
+
+    def on_version_apply(ctx, step, heads, run_args, **kw):
+        nonlocal last
+        now = time.perf_counter()
+        direction = "upgrade" if step.is_upgrade else "downgrade"
+        logger.info("%s %s took %.3fs", direction, step.up_revision_id, now - last)
+        last = now
+
+    return on_version_apply
@@ -1,5 +1,6 @@
 import enum
-from sqlalchemy import Column, Integer, String, Float, Enum as SqlEnum
+from sqlalchemy import Column, Integer, BigInteger, String, Float, DateTime, ForeignKey, Index, Enum as SqlEnum, func
+from sqlalchemy.orm import deferred
 from app.db import Base
 
 class RoleEnum(str, enum.Enum):
@@ -11,12 +12,29 @@ class User(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(50))
     email = Column(String(100), unique=True, index=True)
-    hashed_password = Column(String(255), nullable=False)
+    # Deferred so user lookups never pull the hash unless asked for
+    hashed_password = deferred(Column(String(255), nullable=False))
     role = Column(SqlEnum(RoleEnum, name="userrole"), nullable=False, default=RoleEnum.USER)
 
 class Item(Base):
     __tablename__ = "items"
+    __table_args__ = (
+        # Serves per-owner keyset pagination: WHERE owner_id = ? AND id > ? ORDER BY id
+        Index("ix_items_owner_id_id", "owner_id", "id"),
+    )
     id = Column(Integer, primary_key=True)
     name = Column(String(150))
     description = Column(String(300))
-    price = Column(Float)
\ No newline at end of file
+    price = Column(Float)
+    owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=True)
+
+class OwnerItemCount(Base):
+    __tablename__ = "owner_item_counts"
+    owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    item_count = Column(BigInteger, nullable=False, default=0)
+
+class TableVersion(Base):
+    __tablename__ = "table_versions"
+    table_name = Column(String(64), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
@@ -0,0 +1,171 @@
+"""OpenTelemetry tracing: provider setup, sampling and instrumentation.
+
+Tracing is off unless ``TRACING_ENABLED=true``. Spans are exported over
+OTLP/HTTP to ``OTEL_EXPORTER_OTLP_ENDPOINT`` (default localhost:4318).
+
+Sampling is configured with:
+
+- ``TRACE_HEAD_SAMPLE_RATIO``: fraction of new traces started (parent-based,
+  so an incoming sampled ``traceparent`` is always honoured).
+- ``TRACE_TAIL_SAMPLING=true``: buffer each trace until its local root ends
+  and export it only if it errored, was slower than ``TRACE_TAIL_LATENCY_MS``,
+  or wins a ``TRACE_TAIL_KEEP_RATIO`` draw.
+"""
+import os
+import random
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Optional
+
+from opentelemetry import trace
+from opentelemetry.baggage.propagation import W3CBaggagePropagator
+from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+from opentelemetry.instrumentation.sqlalchemy import SQLAlchemyInstrumentor
+from opentelemetry.propagate import set_global_textmap
+from opentelemetry.propagators.composite import CompositePropagator
+from opentelemetry.sdk.resources import SERVICE_NAME, Resource
+from opentelemetry.sdk.trace import ReadableSpan, SpanProcessor, TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExporter
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+from opentelemetry.trace import StatusCode
+from opentelemetry.trace.propagation.tracecontext import TraceContextTextMapPropagator
+
+_provider: Optional[TracerProvider] = None
+_instrumented_engines = weakref.WeakSet()
+
+
+def tracing_enabled() -> bool:
+    return os.getenv("TRACING_ENABLED", "false").lower() == "true"
+
+
+class TailSamplingSpanProcessor(SpanProcessor):
+    """Buffer spans per trace and pass whole traces worth keeping downstream.
+
+    The decision is made when the trace's local root span ends. At most
+    ``max_traces`` unfinished traces are held; the oldest is dropped first.
+    """
+
+    def __init__(self, downstream: SpanProcessor, latency_threshold: float = 0.5,
+                 keep_ratio: float = 0.1, max_traces: int = 10000):
+        self.downstream = downstream
+        self.latency_threshold = latency_threshold
+        self.keep_ratio = keep_ratio
+        self.max_traces = max_traces
+        self._traces: "OrderedDict[int, list]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def on_start(self, span, parent_context=None) -> None:
+        pass
+
+    def on_end(self, span: ReadableSpan) -> None:
+        trace_id = span.context.trace_id
+        is_local_root = span.parent is None or span.parent.is_remote
+        with self._lock:
+            spans = self._traces.get(trace_id)
+            if spans is None:
+                spans = self._traces[trace_id] = []
+                if len(self._traces) > self.max_traces:
+                    self._traces.popitem(last=False)
+            spans.append(span)
+            if not is_local_root:
+                return
+            del self._traces[trace_id]
+
+        if self._should_keep(span, spans):
+            for buffered in spans:
+                self.downstream.on_end(buffered)
+
+    def _should_keep(self, root: ReadableSpan, spans: list) -> bool:
+        if any(s.status.status_code == StatusCode.ERROR for s in spans):
+            return True
+        if (root.end_time - root.start_time) / 1e9 >= self.latency_threshold:
+            return True
+        return random.random() < self.keep_ratio
+
+    def shutdown(self) -> None:
+        self.downstream.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self.downstream.force_flush(timeout_millis)
+
+
+def build_tracer_provider(exporter: Optional[SpanExporter] = None,
+                          span_processor: Optional[SpanProcessor] = None) -> TracerProvider:
+    """Create a provider from the environment; the exporter defaults to OTLP/HTTP."""
+    ratio = float(os.getenv("TRACE_HEAD_SAMPLE_RATIO", "1.0"))
+    provider = TracerProvider(
+        resource=Resource.create({SERVICE_NAME: os.getenv("OTEL_SERVICE_NAME", "myapp-backend")}),
+        sampler=ParentBased(TraceIdRatioBased(ratio)),
+    )
+
+    if span_processor is None:
+        span_processor = BatchSpanProcessor(exporter or OTLPSpanExporter())
+    if os.getenv("TRACE_TAIL_SAMPLING", "false").lower() == "true":
+        span_processor = TailSamplingSpanProcessor(
+            span_processor,
+            latency_threshold=float(os.getenv("TRACE_TAIL_LATENCY_MS", "500")) / 1000,
+            keep_ratio=float(os.getenv("TRACE_TAIL_KEEP_RATIO", "0.1")),
+        )
+    provider.add_span_processor(span_processor)
+    return provider
+
+
+def configure_tracing(exporter: Optional[SpanExporter] = None,
+                      span_processor: Optional[SpanProcessor] = None,
+                      provider: Optional[TracerProvider] = None) -> TracerProvider:
+    """Install the global tracer provider and W3C propagators, once per process.
+
+    The first call wins; later calls return the installed provider.
+    """
+    global _provider
+    if _provider is None:
+        _provider = provider or build_tracer_provider(exporter, span_processor)
+        trace.set_tracer_provider(_provider)
+        set_global_textmap(CompositePropagator([TraceContextTextMapPropagator(), W3CBaggagePropagator()]))
+    return _provider
+
+
+def instrument_app(app) -> None:
+    FastAPIInstrumentor.instrument_app(app, excluded_urls="healthz,readyz,metrics")
+
+
+def _apply_engine_instrumentation() -> None:
+    # SQLAlchemyInstrumentor is a process-wide singleton that instruments
+    # once, so re-apply it whenever the set of engines changes
+    instrumentor = SQLAlchemyInstrumentor()
+    if instrumentor.is_instrumented_by_opentelemetry:
+        instrumentor.uninstrument()
+    if _instrumented_engines:
+        # The instrumentor's declared range stops short of SQLAlchemy 2.1,
+        # whose engine event API it relies on is unchanged
+        instrumentor.instrument(engines=list(_instrumented_engines), skip_dep_check=True)
+
+
+def instrument_engine(engine) -> None:
+    """Emit a span per SQL statement on an (async) engine; idempotent."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if sync_engine in _instrumented_engines:
+        return
+    _instrumented_engines.add(sync_engine)
+    _apply_engine_instrumentation()
+
+
+def uninstrument_engine(engine) -> None:
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if sync_engine not in _instrumented_engines:
+        return
+    _instrumented_engines.discard(sync_engine)
+    _apply_engine_instrumentation()
+
+
+def add_trace_context(record) -> None:
+    """Loguru patcher that stamps the active trace/span ids on each record."""
+    span_context = trace.get_current_span().get_span_context()
+    if span_context.is_valid:
+        record["extra"]["trace_id"] = format(span_context.trace_id, "032x")
+        record["extra"]["span_id"] = format(span_context.span_id, "016x")
+    else:
+        record["extra"]["trace_id"] = "-"
+        record["extra"]["span_id"] = "-"
@@ -0,0 +1,72 @@
+"""Memory cost of full ORM loads vs. column projections on hot read paths.
+
+Loads N rows (100k by default) from an in-memory SQLite database under
+tracemalloc and reports the bytes and allocated blocks still held per row
+once the result is materialised, plus the peak during the load.
+
+    cd backend && python -m benchmarks.orm_memory [rows]
+"""
+import asyncio
+import gc
+import sys
+import tracemalloc
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker, undefer
+
+from app.db import Base
+from app.models import Item, RoleEnum, User
+
+HASH = "$2b$12$" + "x" * 53
+
+
+async def seed(engine, rows: int) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(User), [
+            {"name": f"user{i}", "email": f"user{i}@example.com", "hashed_password": HASH, "role": RoleEnum.USER}
+            for i in range(rows)
+        ])
+        await conn.execute(insert(Item), [
+            {"name": f"item{i}", "description": "d" * 120, "price": float(i)}
+            for i in range(rows)
+        ])
+
+
+async def measure(session_factory, stmt, scalars: bool, rows: int) -> dict:
+    async with session_factory() as session:
+        gc.collect()
+        tracemalloc.start()
+        result = await session.execute(stmt)
+        loaded = result.scalars().all() if scalars else result.all()
+        current, peak = tracemalloc.get_traced_memory()
+        blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+        tracemalloc.stop()
+        assert len(loaded) == rows
+        del loaded
+    return {"bytes": current / rows, "blocks": blocks / rows, "peak": peak / rows}
+
+
+async def main(rows: int) -> None:
+    engine = create_async_engine("sqlite+aiosqlite://")
+    session_factory = sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+    await seed(engine, rows)
+
+    cases = [
+        ("users: ORM (with hash)", select(User).options(undefer(User.hashed_password)), True),
+        ("users: projection", select(User.id, User.name, User.email), False),
+        ("items: ORM", select(Item), True),
+        ("items: projection", select(Item.id, Item.name, Item.description, Item.price), False),
+    ]
+    print(f"{rows} rows")
+    print(f"{'case':<26}{'bytes/row':>12}{'blocks/row':>12}{'peak/row':>12}")
+    for label, stmt, scalars in cases:
+        stats = await measure(session_factory, stmt, scalars, rows)
+        print(f"{label:<26}{stats['bytes']:>12.0f}{stats['blocks']:>12.1f}{stats['peak']:>12.0f}")
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000))
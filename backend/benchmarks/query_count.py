@@ -0,0 +1,112 @@
+"""Statements per request for the user/item write paths, before and after.
+
+The "before" functions reproduce the old handlers (SELECT, then
+session.add/delete, then refresh); the "after" ones are the single-statement
+helpers in app.crud. Statements are counted at the DBAPI cursor, so every
+one of them is a database round trip. Table-version bumps and the auth
+lookup are identical on both sides and left out.
+
+    cd backend && python -m benchmarks.query_count [iterations]
+"""
+import asyncio
+import sys
+import time
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.crud import delete_item_returning, delete_user_returning, insert_user
+from app.db import Base
+from app.models import Item, RoleEnum, User
+
+HASH = "$2b$12$" + "x" * 53
+
+
+async def create_user_before(session, i):
+    result = await session.execute(select(User).where(User.email == f"u{i}@example.com"))
+    if result.scalar_one_or_none():
+        return None
+    user = User(name=f"u{i}", email=f"u{i}@example.com", hashed_password=HASH, role=RoleEnum.USER)
+    session.add(user)
+    await session.commit()
+    await session.refresh(user)
+    return user.id
+
+
+async def create_user_after(session, i):
+    row = await insert_user(session, f"u{i}", f"u{i}@example.com", HASH, RoleEnum.USER)
+    await session.commit()
+    return row.id
+
+
+async def delete_user_before(session, user_id):
+    result = await session.execute(select(User).where(User.id == user_id))
+    user = result.scalar_one_or_none()
+    await session.delete(user)
+    await session.commit()
+
+
+async def delete_user_after(session, user_id):
+    await delete_user_returning(session, user_id)
+    await session.commit()
+
+
+async def delete_item_before(session, item_id):
+    result = await session.execute(select(Item).where(Item.id == item_id))
+    item = result.scalar_one_or_none()
+    await session.delete(item)
+    await session.commit()
+
+
+async def delete_item_after(session, item_id):
+    await delete_item_returning(session, item_id, owner_id=None)
+    await session.commit()
+
+
+async def run(label, engine, session_factory, create, delete_user, delete_item, iterations):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(Item.__table__.insert(), [{"name": f"i{i}", "price": 1.0} for i in range(iterations)])
+
+    statements = 0
+
+    def count(*args):
+        nonlocal statements
+        statements += 1
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count)
+    results = {}
+    try:
+        for name, fn, args in (
+            ("register", create, range(iterations)),
+            ("delete user", delete_user, range(1, iterations + 1)),
+            ("delete item", delete_item, range(1, iterations + 1)),
+        ):
+            statements = 0
+            start = time.perf_counter()
+            for arg in args:
+                async with session_factory() as session:
+                    await fn(session, arg)
+            elapsed = time.perf_counter() - start
+            results[name] = (statements / iterations, elapsed / iterations * 1e6)
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", count)
+
+    for name, (per_request, micros) in results.items():
+        print(f"{label:<8}{name:<14}{per_request:>10.1f}{micros:>12.0f}")
+
+
+async def main(iterations: int) -> None:
+    engine = create_async_engine("sqlite+aiosqlite://")
+    session_factory = sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+    print(f"{iterations} requests per operation (SQLite)")
+    print(f"{'':<8}{'operation':<14}{'stmts/req':>10}{'us/req':>12}")
+    await run("before", engine, session_factory, create_user_before, delete_user_before, delete_item_before, iterations)
+    await run("after", engine, session_factory, create_user_after, delete_user_after, delete_item_after, iterations)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000))
@@ -0,0 +1,119 @@
+"""Per-request cost of tracing, measured offline.
+
+Runs an authenticated GET /me/items (token decode, user lookup, item page
+and counter query) in-process against SQLite in four modes: tracing off,
+spans exported to an in-memory exporter, spans exported over OTLP/HTTP to a
+local in-memory collector, and the same with tail sampling. Each mode runs
+in a fresh interpreter because the global tracer provider can only be set
+once per process.
+
+    cd backend && python -m benchmarks.tracing_overhead [requests]
+"""
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+
+MODES = ("off", "memory", "otlp", "otlp+tail")
+
+
+async def measure(mode: str, requests: int) -> dict:
+    from httpx import ASGITransport, AsyncClient
+    from loguru import logger
+    from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+
+    from app.db import Base, get_db
+    from app.main import create_app
+    from app.tracing import configure_tracing, instrument_engine
+    from benchmarks.otlp_collector import OTLPCollector
+
+    logger.remove()
+    collector = None
+    if mode != "off":
+        os.environ["TRACING_ENABLED"] = "true"
+        if mode == "memory":
+            exporter = InMemorySpanExporter()
+        else:
+            collector = OTLPCollector().__enter__()
+            exporter = OTLPSpanExporter(endpoint=collector.endpoint)
+        if mode.endswith("+tail"):
+            os.environ.update(TRACE_TAIL_SAMPLING="true", TRACE_TAIL_KEEP_RATIO="0.1")
+        provider = configure_tracing(span_processor=BatchSpanProcessor(exporter))
+
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    session_factory = sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    async def override_get_db():
+        async with session_factory() as session:
+            yield session
+
+    app = create_app()
+    app.dependency_overrides[get_db] = override_get_db
+    if mode != "off":
+        instrument_engine(engine)
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+        await client.post("/register", json={"name": "bench", "email": "bench@example.com", "password": "secret"})
+        res = await client.post("/login", json={"email": "bench@example.com", "password": "secret"})
+        headers = {"Authorization": f"Bearer {res.json()['access_token']}"}
+        for i in range(20):
+            await client.post("/items", headers=headers, json={"name": f"i{i}", "description": "d", "price": 1.0})
+
+        for _ in range(50):
+            await client.get("/me/items", headers=headers)
+        timings = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            await client.get("/me/items", headers=headers)
+            timings.append(time.perf_counter() - start)
+
+    exported = None
+    if mode != "off":
+        provider.force_flush()
+        exported = len(exporter.get_finished_spans()) if mode == "memory" else len(collector.spans)
+        provider.shutdown()
+    if collector is not None:
+        collector.__exit__(None, None, None)
+
+    timings.sort()
+    return {
+        "mode": mode,
+        "mean_us": sum(timings) / len(timings) * 1e6,
+        "p50_us": timings[len(timings) // 2] * 1e6,
+        "p99_us": timings[int(len(timings) * 0.99)] * 1e6,
+        "spans": exported,
+    }
+
+
+def main(requests: int) -> None:
+    results = []
+    for mode in MODES:
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.tracing_overhead", "--mode", mode, str(requests)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        results.append(json.loads(out.strip().splitlines()[-1]))
+
+    baseline = results[0]["mean_us"]
+    print(f"{requests} x GET /me/items per mode")
+    print(f"{'mode':<11}{'mean us':>10}{'p50 us':>10}{'p99 us':>10}{'overhead':>10}{'spans':>8}")
+    for r in results:
+        overhead = (r["mean_us"] / baseline - 1) * 100
+        spans = "-" if r["spans"] is None else r["spans"]
+        print(f"{r['mode']:<11}{r['mean_us']:>10.0f}{r['p50_us']:>10.0f}{r['p99_us']:>10.0f}{overhead:>9.1f}%{spans:>8}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "--mode":
+        print(json.dumps(asyncio.run(measure(sys.argv[2], int(sys.argv[3])))))
+    else:
+        main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -4,8 +4,23 @@ from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from starlette.testclient import TestClient
 from sqlalchemy.pool import StaticPool
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
 
 from app.db import Base
+from app.models import RoleEnum
+from app.tracing import configure_tracing
+
+# The global tracer provider can only be set once per process. Claim it for
+# the test session before any app is built, so TRACING_ENABLED=true in a
+# developer's .env records spans in memory instead of installing an OTLP
+# provider that tracing tests could not see.
+SPAN_EXPORTER = InMemorySpanExporter()
+_test_provider = TracerProvider()
+_test_provider.add_span_processor(SimpleSpanProcessor(SPAN_EXPORTER))
+configure_tracing(provider=_test_provider)
+
 from app.main import create_app
 from app.dependencies import get_db  # get it from dependencies, not main
 
@@ -28,6 +43,16 @@ def app():
     app.dependency_overrides[get_db] = override_get_db
     return app
 
+@pytest.fixture(scope="session")
+def db_engine():
+    return engine
+
+@pytest.fixture
+def span_exporter():
+    SPAN_EXPORTER.clear()
+    yield SPAN_EXPORTER
+    SPAN_EXPORTER.clear()
+
 @pytest.fixture(autouse=True, scope="function")
 async def setup_database():
     async with engine.begin() as conn:
@@ -40,6 +65,23 @@ async def client(app):
     async with AsyncClient(app=app, base_url="http://test") as c:
         yield c
 
+@pytest.fixture
+def auth_headers(client):
+    """Register a user (if needed), log in and return an Authorization header."""
+    async def login(email: str, role: RoleEnum = RoleEnum.USER) -> dict:
+        await client.post("/register", json={
+            "name": email.split("@")[0],
+            "email": email,
+            "password": "secret",
+            "role": role.value
+        })
+        res = await client.post("/login", json={
+            "email": email,
+            "password": "secret"
+        })
+        return {"Authorization": f"Bearer {res.json()['access_token']}"}
+    return login
+
 @pytest.fixture
 def client_sync(app):
     with TestClient(app) as c:
@@ -66,6 +66,35 @@ async def test_delete_user(client: AsyncClient):
     assert res.json()["ok"] is True
 
 
+@pytest.mark.asyncio
+async def test_register_duplicate_email(client: AsyncClient):
+    payload = {"name": "dup", "email": "dup@example.com", "password": "secret"}
+    res = await client.post("/register", json=payload)
+    assert res.status_code == 200
+
+    res = await client.post("/register", json=payload)
+    assert res.status_code == 400
+    assert res.json()["detail"] == "Email already registered"
+
+
+@pytest.mark.asyncio
+async def test_delete_missing_user(client: AsyncClient):
+    await client.post("/register", json={
+        "name": "admin",
+        "email": "admin@example.com",
+        "password": "secret",
+        "role": RoleEnum.ADMIN.value
+    })
+    res = await client.post("/login", json={
+        "email": "admin@example.com",
+        "password": "secret"
+    })
+    token = res.json()["access_token"]
+
+    res = await client.delete("/users/9999", headers={"Authorization": f"Bearer {token}"})
+    assert res.status_code == 404
+
+
 @pytest.mark.asyncio
 async def test_get_items_empty(client: AsyncClient):
     res = await client.get("/items")
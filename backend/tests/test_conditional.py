@@ -0,0 +1,121 @@
+import pytest
+from httpx import AsyncClient
+from starlette.applications import Starlette
+from starlette.responses import StreamingResponse
+from starlette.routing import Route
+
+from app.compression import CompressionMiddleware, negotiate_encoding, supported_encodings
+
+
+def vary(res) -> list:
+    return [v.strip().lower() for v in res.headers["vary"].split(",")]
+
+
+@pytest.mark.asyncio
+async def test_items_not_modified(client: AsyncClient):
+    res = await client.get("/items")
+    assert res.status_code == 200
+    etag = res.headers["etag"]
+    assert etag.startswith('W/"items-')
+
+    res = await client.get("/items", headers={"If-None-Match": etag})
+    assert res.status_code == 304
+    assert res.content == b""
+    assert res.headers["etag"] == etag
+    assert vary(res) == ["accept-encoding", "origin"]
+
+
+@pytest.mark.asyncio
+async def test_items_etag_changes_on_write(client: AsyncClient, auth_headers):
+    headers = await auth_headers("owner@example.com")
+    res = await client.get("/items")
+    etag = res.headers["etag"]
+
+    res = await client.post("/items", headers=headers, json={
+        "name": "Fresh",
+        "description": "Invalidates the ETag",
+        "price": 2.5
+    })
+    assert res.status_code == 200
+
+    res = await client.get("/items", headers={"If-None-Match": etag})
+    assert res.status_code == 200
+    assert res.headers["etag"] != etag
+    assert res.headers["last-modified"]
+
+    res = await client.get("/items", headers={"If-Modified-Since": res.headers["last-modified"]})
+    assert res.status_code == 304
+
+
+@pytest.mark.asyncio
+async def test_last_modified_moves_for_writes_in_the_same_second(client: AsyncClient, auth_headers):
+    headers = await auth_headers("owner@example.com")
+    item = {"name": "Quick", "description": "Two writes, one second", "price": 1.0}
+
+    await client.post("/items", headers=headers, json=item)
+    first = (await client.get("/items")).headers["last-modified"]
+    await client.post("/items", headers=headers, json=item)
+    res = await client.get("/items", headers={"If-Modified-Since": first})
+    assert res.status_code == 200
+    assert res.headers["last-modified"] != first
+
+    res = await client.get("/items", headers={"If-Modified-Since": res.headers["last-modified"]})
+    assert res.status_code == 304
+
+
+@pytest.mark.asyncio
+async def test_large_response_is_compressed(client: AsyncClient, auth_headers):
+    headers = await auth_headers("owner@example.com")
+    for i in range(20):
+        await client.post("/items", headers=headers, json={
+            "name": f"Item {i}",
+            "description": "A description long enough to cross the threshold",
+            "price": float(i)
+        })
+
+    res = await client.get("/items", headers={"Accept-Encoding": "gzip"})
+    assert res.status_code == 200
+    assert res.headers["content-encoding"] == "gzip"
+    assert vary(res) == ["accept-encoding", "origin"]
+    assert len(res.json()) == 20
+
+    res = await client.get("/healthz", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in res.headers
+
+
+def streaming_app(chunks):
+    async def stream(request):
+        async def body():
+            for chunk in chunks:
+                yield chunk
+        return StreamingResponse(body(), media_type="text/plain")
+
+    return CompressionMiddleware(Starlette(routes=[Route("/stream", stream)]), minimum_size=500)
+
+
+@pytest.mark.asyncio
+async def test_streaming_response_is_compressed_in_chunks():
+    chunks = [f"line {i} ".encode() * 20 for i in range(10)]
+    async with AsyncClient(app=streaming_app(chunks), base_url="http://test") as c:
+        res = await c.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert res.headers["content-encoding"] == "gzip"
+    assert "content-length" not in res.headers
+    assert res.content == b"".join(chunks)
+
+
+@pytest.mark.asyncio
+async def test_small_streaming_response_is_not_compressed():
+    chunks = [b"tiny ", b"stream"]
+    async with AsyncClient(app=streaming_app(chunks), base_url="http://test") as c:
+        res = await c.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in res.headers
+    assert res.headers["content-length"] == "11"
+    assert res.content == b"tiny stream"
+
+
+def test_negotiate_encoding():
+    assert negotiate_encoding("gzip, deflate") == "gzip"
+    assert negotiate_encoding("identity") is None
+    assert negotiate_encoding("gzip;q=0, *;q=0") is None
+    assert negotiate_encoding("br;q=0, gzip;q=0.5") == "gzip"
+    assert negotiate_encoding("gzip, br") == supported_encodings()[0]
@@ -0,0 +1,121 @@
+import random
+
+import pytest
+from httpx import AsyncClient
+
+from app.latency import DDSketch, LatencyTracker, RollingWindow
+from app.main import create_app
+from app.models import RoleEnum
+
+
+class FakeClock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_sketch_quantiles_within_relative_accuracy():
+    rng = random.Random(7)
+    values = [rng.lognormvariate(-4, 1) for _ in range(20000)]
+    sketch = DDSketch(relative_accuracy=0.01)
+    for value in values:
+        sketch.add(value)
+
+    values.sort()
+    for q in (0.5, 0.9, 0.99, 0.999):
+        exact = values[int(q * (len(values) - 1))]
+        assert abs(sketch.quantile(q) - exact) / exact <= 0.01
+
+
+def test_sketches_merge_across_workers():
+    rng = random.Random(11)
+    single, first, second = DDSketch(), DDSketch(), DDSketch()
+    for i in range(5000):
+        value = rng.expovariate(20)
+        single.add(value)
+        (first if i % 2 else second).add(value)
+
+    merged = DDSketch.from_dict(first.to_dict())
+    merged.merge(DDSketch.from_dict(second.to_dict()))
+    assert merged.count == single.count
+    assert merged.quantile(0.99) == single.quantile(0.99)
+
+
+def test_sketch_memory_is_bounded():
+    sketch = DDSketch(max_buckets=64)
+    for exponent in range(-6, 4):
+        for step in range(1, 100):
+            sketch.add(step * 10.0 ** exponent)
+    assert len(sketch.buckets) == 64
+    assert sketch.quantile(1.0) == sketch.max
+
+
+def test_rolling_window_expires_old_slots():
+    window = RollingWindow(60, slots=12)
+    window.record(0.5, bad=True, now=1000.0)
+    window.record(0.01, bad=False, now=1030.0)
+    assert window.counts(1030.0) == (2, 1)
+    assert window.counts(1062.0) == (1, 0)
+    assert window.sketch(1100.0).count == 0
+
+
+def test_burn_rate_flips_degraded_on_both_windows():
+    clock = FakeClock()
+    tracker = LatencyTracker(threshold=0.1, objective=0.99, burn_threshold=14.4, min_requests=10, clock=clock)
+    for _ in range(100):
+        tracker.record("/items", 0.01, 200)
+    assert tracker.status()["degraded"] is False
+
+    # 20% bad is a 20x burn on a 1% budget
+    for _ in range(25):
+        tracker.record("/items", 0.5, 200)
+    status = tracker.status()
+    assert status["burn_rate"]["5m"] == pytest.approx(20)
+    assert status["degraded"] is True
+
+    # Once the bad minutes leave the 5m window the short burn recovers
+    clock.now += 600
+    for _ in range(100):
+        tracker.record("/items", 0.01, 200)
+    assert tracker.status()["burn_rate"]["5m"] == 0
+    assert tracker.status()["degraded"] is False
+
+
+@pytest.mark.asyncio
+async def test_admin_latency_report(client: AsyncClient, auth_headers):
+    admin = await auth_headers("admin@example.com", RoleEnum.ADMIN)
+    user = await auth_headers("user@example.com")
+    await client.get("/items")
+    await client.get("/healthz")
+
+    res = await client.get("/admin/latency", headers=user)
+    assert res.status_code == 403
+
+    res = await client.get("/admin/latency", headers=admin, params={"include_sketches": True})
+    assert res.status_code == 200
+    body = res.json()
+    assert "/healthz" not in body["routes"]
+    items = body["routes"]["/items"]
+    assert set(items) == {"1m", "5m", "1h"}
+    assert items["1m"]["count"] >= 1
+    assert items["1m"]["p50"] <= items["1m"]["p999"]
+    assert DDSketch.from_dict(items["1h"]["sketch"]).count == items["1h"]["count"]
+
+
+@pytest.mark.asyncio
+async def test_readiness_reports_and_optionally_fails_when_degraded(monkeypatch):
+    degraded_app = create_app()
+    for _ in range(50):
+        degraded_app.state.latency.record("/items", 5.0, 200)
+
+    async with AsyncClient(app=degraded_app, base_url="http://test") as c:
+        res = await c.get("/readyz")
+        assert res.status_code == 200
+        assert res.json()["degraded"] is True
+
+        monkeypatch.setenv("SLO_DEGRADED_FAILS_READINESS", "true")
+        res = await c.get("/readyz")
+        assert res.status_code == 503
+        assert res.json()["ok"] is False
@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+from httpx import AsyncClient
+from opentelemetry.sdk.trace import TracerProvider
+
+from app.main import create_app
+from app.metrics import AppMetrics, MetricsExposition
+
+
+@pytest.mark.asyncio
+async def test_each_app_has_its_own_registry(app):
+    first, second = create_app(), create_app()
+    assert first.state.metrics.registry is not second.state.metrics.registry
+
+    second.dependency_overrides.update(app.dependency_overrides)
+    async with AsyncClient(app=second, base_url="http://test") as c:
+        await c.get("/healthz")
+        res = await c.get("/metrics")
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/plain")
+    assert 'http_request_duration_seconds_count{method="GET",route="/healthz",status="200"} 1.0' in res.text
+    assert second.state.metrics.registry.get_sample_value("http_requests_total") == 2
+    assert first.state.metrics.registry.get_sample_value("http_requests_total") == 0
+
+
+@pytest.mark.asyncio
+async def test_openmetrics_exposition_carries_trace_exemplars():
+    metrics = AppMetrics()
+    tracer = TracerProvider().get_tracer(__name__)
+    with tracer.start_as_current_span("request") as span:
+        metrics.observe_request("GET", "/items", 200, 0.003)
+    trace_id = format(span.get_span_context().trace_id, "032x")
+
+    data, content_type = await MetricsExposition(metrics.registry).render(
+        "application/openmetrics-text; version=1.0.0"
+    )
+    assert content_type.startswith("application/openmetrics-text")
+    assert f'# {{trace_id="{trace_id}"}} 0.003' in data.decode()
+
+
+def test_cardinality_guard_drops_new_label_sets():
+    metrics = AppMetrics(max_label_sets=2)
+    for route in ("/a", "/b", "/c", "/d"):
+        metrics.observe_request("GET", route, 200, 0.01)
+    metrics.observe_request("GET", "/a", 200, 0.01)
+
+    registry = metrics.registry
+    count = "http_request_duration_seconds_count"
+    assert registry.get_sample_value(count, {"method": "GET", "route": "/a", "status": "200"}) == 2
+    assert registry.get_sample_value(count, {"method": "GET", "route": "/c", "status": "200"}) is None
+    assert registry.get_sample_value(
+        "metrics_dropped_label_sets_total", {"metric": "http_request_duration_seconds"}
+    ) == 2
+
+
+@pytest.mark.asyncio
+async def test_exposition_is_cached_for_ttl():
+    metrics = AppMetrics()
+    exposition = MetricsExposition(metrics.registry, ttl=0.2)
+    before, _ = await exposition.render()
+    metrics.requests.inc()
+    after, _ = await exposition.render()
+    assert after is before
+
+    await asyncio.sleep(0.25)
+    fresh, _ = await exposition.render()
+    assert b"http_requests_total 1.0" in fresh
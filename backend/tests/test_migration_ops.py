@@ -0,0 +1,70 @@
+import io
+
+import pytest
+from alembic import op
+from alembic.operations import Operations
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy import Column, Integer, create_engine, text
+
+from app import migration_ops
+
+
+@pytest.fixture
+def operations():
+    engine = create_engine("sqlite://")
+    with engine.connect() as conn:
+        conn.execute(text("CREATE TABLE big (id INTEGER PRIMARY KEY, v INTEGER, flag INTEGER)"))
+        conn.execute(text("INSERT INTO big (id, v) VALUES " + ", ".join(f"({i}, {i})" for i in range(1, 2501))))
+        conn.commit()
+        ctx = MigrationContext.configure(conn)
+        with Operations.context(ctx), ctx.begin_transaction():
+            yield conn
+    migration_ops.configure(dry_run=False)
+
+
+def test_batched_backfill(operations):
+    updated = migration_ops.batched_backfill("big", "flag = v % 2", where="flag IS NULL", batch_size=1000, pause=0)
+    assert updated == 2500
+    assert operations.execute(text("SELECT count(*) FROM big WHERE flag IS NULL")).scalar() == 0
+
+
+def test_dry_run_renders_sql_and_executes_nothing():
+    engine = create_engine("sqlite://")
+    output = io.StringIO()
+    with engine.connect() as conn:
+        conn.execute(text("CREATE TABLE big (id INTEGER PRIMARY KEY, v INTEGER, flag INTEGER)"))
+        conn.execute(text("INSERT INTO big (id, v) VALUES " + ", ".join(f"({i}, {i})" for i in range(1, 2501))))
+        conn.commit()
+
+        migration_ops.configure(dry_run=True, estimate_bind=conn)
+        ctx = MigrationContext.configure(dialect_name="sqlite", opts={"as_sql": True, "output_buffer": output})
+        try:
+            with Operations.context(ctx):
+                assert migration_ops.estimate_rows("big", "v > 2000") == 500
+                assert migration_ops.estimate_rows("not_created_yet") is None
+                op.add_column("big", Column("extra", Integer()))
+                assert migration_ops.batched_backfill("big", "flag = 1") == 0
+                migration_ops.create_index_concurrently("ix_big_flag", "big", ["flag"])
+        finally:
+            migration_ops.configure(dry_run=False)
+
+        assert "ALTER TABLE big ADD COLUMN extra INTEGER" in output.getvalue()
+        assert "CREATE INDEX ix_big_flag ON big (flag)" in output.getvalue()
+        assert conn.execute(text("SELECT count(*) FROM big WHERE flag IS NULL")).scalar() == 2500
+        columns = [row[1] for row in conn.execute(text("PRAGMA table_info(big)"))]
+        assert "extra" not in columns
+        indexes = conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'")).scalars().all()
+        assert "ix_big_flag" not in indexes
+
+
+def test_dry_run_skips_helpers_on_a_live_connection(operations):
+    migration_ops.configure(dry_run=True, estimate_bind=operations)
+    migration_ops.create_index_concurrently("ix_big_flag", "big", ["flag"])
+    indexes = operations.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'")).scalars().all()
+    assert "ix_big_flag" not in indexes
+
+
+def test_create_index_falls_back_outside_postgres(operations):
+    migration_ops.create_index_concurrently("ix_big_v", "big", ["v"])
+    indexes = operations.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'")).scalars().all()
+    assert "ix_big_v" in indexes
@@ -0,0 +1,52 @@
+import pytest
+from httpx import AsyncClient
+
+
+async def create_item(client: AsyncClient, headers: dict, name: str) -> int:
+    res = await client.post("/items", headers=headers, json={
+        "name": name,
+        "description": "owned item",
+        "price": 1.0
+    })
+    assert res.status_code == 200
+    return res.json()["id"]
+
+
+@pytest.mark.asyncio
+async def test_my_items_keyset_pagination(client: AsyncClient, auth_headers):
+    alice = await auth_headers("alice@example.com")
+    bob = await auth_headers("bob@example.com")
+    for i in range(5):
+        await create_item(client, alice, f"alice-{i}")
+    await create_item(client, bob, "bob-0")
+
+    res = await client.get("/me/items", headers=alice, params={"limit": 2})
+    assert res.status_code == 200
+    assert [i["name"] for i in res.json()] == ["alice-0", "alice-1"]
+    assert res.headers["x-total-count"] == "5"
+
+    names = [i["name"] for i in res.json()]
+    while "x-next-cursor" in res.headers:
+        res = await client.get("/me/items", headers=alice, params={
+            "limit": 2, "after": res.headers["x-next-cursor"]
+        })
+        names += [i["name"] for i in res.json()]
+    assert names == [f"alice-{i}" for i in range(5)]
+
+
+@pytest.mark.asyncio
+async def test_delete_requires_ownership(client: AsyncClient, auth_headers):
+    alice = await auth_headers("alice@example.com")
+    bob = await auth_headers("bob@example.com")
+    item_id = await create_item(client, alice, "alice-only")
+
+    res = await client.delete(f"/items/{item_id}", headers=bob)
+    assert res.status_code == 404
+
+    res = await client.delete(f"/items/{item_id}", headers=alice)
+    assert res.status_code == 200
+    assert res.json()["ok"] is True
+
+    res = await client.get("/me/items", headers=alice)
+    assert res.json() == []
+    assert res.headers["x-total-count"] == "0"
@@ -0,0 +1,95 @@
+import pytest
+from httpx import AsyncClient
+from loguru import logger
+from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.trace import Status, StatusCode
+
+from app import db
+from app.main import create_app
+from app.tracing import TailSamplingSpanProcessor, instrument_engine, uninstrument_engine
+from benchmarks.otlp_collector import OTLPCollector
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+
+
+@pytest.fixture
+async def traced_client(monkeypatch, app, db_engine, span_exporter):
+    # Spans go to the session's in-memory provider installed by conftest
+    monkeypatch.setenv("TRACING_ENABLED", "true")
+    traced_app = create_app()
+    traced_app.dependency_overrides.update(app.dependency_overrides)
+    instrument_engine(db_engine)
+    try:
+        async with AsyncClient(app=traced_app, base_url="http://test") as c:
+            yield c
+    finally:
+        uninstrument_engine(db_engine)
+        uninstrument_engine(db.engine)
+
+
+@pytest.mark.asyncio
+async def test_login_is_traced_across_layers(traced_client: AsyncClient, span_exporter):
+    await traced_client.post("/register", json={
+        "name": "traced",
+        "email": "traced@example.com",
+        "password": "secret"
+    })
+    span_exporter.clear()
+
+    res = await traced_client.post("/login", json={
+        "email": "traced@example.com",
+        "password": "secret"
+    }, headers={"traceparent": f"00-{TRACE_ID}-00f067aa0ba902b7-01"})
+    assert res.status_code == 200
+
+    spans = span_exporter.get_finished_spans()
+    names = {span.name for span in spans}
+    assert {"POST /login", "auth.verify_password", "auth.create_access_token"} <= names
+    assert any(span.attributes.get("db.statement", "").startswith("SELECT") for span in spans)
+    # The incoming W3C traceparent is continued, not replaced
+    assert {format(span.context.trace_id, "032x") for span in spans} == {TRACE_ID}
+
+
+def test_tail_sampling_keeps_errors_and_drops_fast_traces():
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(
+        TailSamplingSpanProcessor(SimpleSpanProcessor(exporter), latency_threshold=60, keep_ratio=0)
+    )
+    tracer = provider.get_tracer(__name__)
+
+    with tracer.start_as_current_span("fast"):
+        with tracer.start_as_current_span("fast.child"):
+            pass
+    assert exporter.get_finished_spans() == ()
+
+    with tracer.start_as_current_span("failing"):
+        with tracer.start_as_current_span("failing.child") as child:
+            child.set_status(Status(StatusCode.ERROR))
+    assert {span.name for span in exporter.get_finished_spans()} == {"failing", "failing.child"}
+
+
+def test_otlp_exporter_to_local_collector():
+    with OTLPCollector() as collector:
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(OTLPSpanExporter(endpoint=collector.endpoint)))
+        with provider.get_tracer(__name__).start_as_current_span("exported") as span:
+            trace_id = format(span.get_span_context().trace_id, "032x")
+        provider.shutdown()
+    assert collector.spans == [("exported", trace_id)]
+
+
+def test_log_records_carry_trace_id():
+    provider = TracerProvider()
+    trace_ids = []
+    handler_id = logger.add(lambda message: trace_ids.append(message.record["extra"]["trace_id"]))
+    try:
+        with provider.get_tracer(__name__).start_as_current_span("logging") as span:
+            logger.info("inside a span")
+        logger.info("outside a span")
+    finally:
+        logger.remove(handler_id)
+    assert trace_ids == [format(span.get_span_context().trace_id, "032x"), "-"]
@@ -1,16 +1,21 @@
 BEGIN;
 
+SET lock_timeout = '5s';
+
+SET statement_timeout = '15min';
+
 CREATE TABLE alembic_version (
     version_num VARCHAR(32) NOT NULL, 
     CONSTRAINT alembic_version_pkc PRIMARY KEY (version_num)
 );
 
--- Running upgrade  -> 4f6cc5ab2006
+-- Running upgrade  -> 584dc86568bc
 
 CREATE TABLE items (
     id SERIAL NOT NULL, 
     name VARCHAR(150), 
     description VARCHAR(300), 
+    price FLOAT, 
     PRIMARY KEY (id)
 );
 
@@ -18,29 +23,82 @@ CREATE TABLE users (
     id SERIAL NOT NULL, 
     name VARCHAR(50), 
     email VARCHAR(100), 
+    hashed_password VARCHAR(255) NOT NULL, 
     PRIMARY KEY (id), 
     UNIQUE (email)
 );
 
-INSERT INTO alembic_version (version_num) VALUES ('4f6cc5ab2006') RETURNING alembic_version.version_num;
+INSERT INTO alembic_version (version_num) VALUES ('584dc86568bc') RETURNING alembic_version.version_num;
+
+-- Running upgrade 584dc86568bc -> 909dc16b4794
+
+CREATE TYPE userrole AS ENUM ('ADMIN', 'USER');
 
--- Running upgrade 4f6cc5ab2006 -> 95b9df28fe94
+ALTER TABLE users ADD COLUMN role userrole DEFAULT 'USER' NOT NULL;
 
-ALTER TABLE items ADD COLUMN price FLOAT;
+ALTER TABLE users ALTER COLUMN role DROP DEFAULT;
+
+UPDATE alembic_version SET version_num='909dc16b4794' WHERE alembic_version.version_num = '584dc86568bc';
+
+-- Running upgrade 909dc16b4794 -> 3c7a1e9d52f0
+
+CREATE TABLE table_versions (
+    table_name VARCHAR(64) NOT NULL, 
+    version BIGINT NOT NULL, 
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT now() NOT NULL, 
+    PRIMARY KEY (table_name)
+);
 
-UPDATE alembic_version SET version_num='95b9df28fe94' WHERE alembic_version.version_num = '4f6cc5ab2006';
+INSERT INTO table_versions (table_name, version) VALUES ('users', 1);
 
--- Running upgrade 95b9df28fe94 -> 21b96f98d5c3
+INSERT INTO table_versions (table_name, version) VALUES ('items', 1);
 
-ALTER TABLE items ADD COLUMN stock INTEGER;
+UPDATE alembic_version SET version_num='3c7a1e9d52f0' WHERE alembic_version.version_num = '909dc16b4794';
 
-UPDATE alembic_version SET version_num='21b96f98d5c3' WHERE alembic_version.version_num = '95b9df28fe94';
+-- Running upgrade 3c7a1e9d52f0 -> a4d2f81b6c37
+
+ALTER TABLE items ADD COLUMN IF NOT EXISTS owner_id INTEGER;
+
+ALTER TABLE items ADD CONSTRAINT items_owner_id_fkey FOREIGN KEY(owner_id) REFERENCES users (id) ON DELETE CASCADE NOT VALID;
+
+CREATE TABLE IF NOT EXISTS owner_item_counts (
+    owner_id INTEGER NOT NULL, 
+    item_count BIGINT NOT NULL, 
+    PRIMARY KEY (owner_id), 
+    FOREIGN KEY(owner_id) REFERENCES users (id) ON DELETE CASCADE
+);
+
+INSERT INTO owner_item_counts (owner_id, item_count) SELECT owner_id, count(*) FROM items WHERE owner_id IS NOT NULL GROUP BY owner_id ON CONFLICT (owner_id) DO NOTHING;
+
+COMMIT;
 
--- Running upgrade 21b96f98d5c3 -> a01a0539b1f8
+SET lock_timeout = '0';
 
-ALTER TABLE items DROP COLUMN stock;
+SET statement_timeout = '0';
+
+ALTER TABLE items VALIDATE CONSTRAINT items_owner_id_fkey;
+
+SET lock_timeout = '5s';
+
+SET statement_timeout = '15min';
+
+BEGIN;
+
+COMMIT;
+
+SET lock_timeout = '0';
+
+SET statement_timeout = '0';
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_items_owner_id_id ON items (owner_id, id);
+
+SET lock_timeout = '5s';
+
+SET statement_timeout = '15min';
+
+BEGIN;
 
-UPDATE alembic_version SET version_num='a01a0539b1f8' WHERE alembic_version.version_num = '21b96f98d5c3';
+UPDATE alembic_version SET version_num='a4d2f81b6c37' WHERE alembic_version.version_num = '3c7a1e9d52f0';
 
 COMMIT;
 